@@ -1,18 +1,23 @@
 #!/usr/bin/env python3
 
 import os
+import io
+import wave
 import time
+import atexit
+import queue
+import threading
 import datetime
 import subprocess
 import signal
+import select
 import sys
-import argparse
+import importlib.util
 
-try:
-    import pygame
-    PYGAME_AVAILABLE = True
-except ImportError:
-    PYGAME_AVAILABLE = False
+# pygame is imported lazily where it is used; only check that it is installed
+PYGAME_AVAILABLE = importlib.util.find_spec("pygame") is not None
+SOUNDDEVICE_AVAILABLE = (importlib.util.find_spec("sounddevice") is not None
+                         and importlib.util.find_spec("soundfile") is not None)
 
 # Dictionary mapping time components to audio filenames
 # Note: Replace these with your actual filenames
@@ -50,29 +55,61 @@ AUDIO_FILES = {
 # Path to your audio files directory
 AUDIO_DIR = os.path.expanduser("~/time_announcer_audio")
 
-# Time periods in Bangla
-TIME_PERIODS = {
+# Full paths of the audio files, filled in by get_audio_path() on first use
+AUDIO_PATHS = {}
+
+# Re-check the audio files on disk after this many seconds
+AUDIO_VALIDATION_TTL = 3600
+
+# Time periods in Bangla, indexed by hour (0-23)
+TIME_PERIODS = (
+    # Night: 12 AM to 3 AM
+    'period_night', 'period_night', 'period_night', 'period_night',
     # Dawn: 4 AM to 6 AM
-    4: 'period_dawn', 5: 'period_dawn',
+    'period_dawn', 'period_dawn',
     # Morning: 6 AM to 11 AM
-    6: 'period_morning', 7: 'period_morning', 8: 'period_morning', 
-    9: 'period_morning', 10: 'period_morning', 11: 'period_morning',
+    'period_morning', 'period_morning', 'period_morning',
+    'period_morning', 'period_morning', 'period_morning',
     # Noon/Afternoon: 12 PM to 3 PM
-    12: 'period_noon', 13: 'period_noon', 14: 'period_noon', 15: 'period_noon',
+    'period_noon', 'period_noon', 'period_noon', 'period_noon',
     # Evening: 4 PM to 5 PM
-    16: 'period_evening', 17: 'period_evening',
+    'period_evening', 'period_evening',
     # Dusk: 6 PM to 7 PM
-    18: 'period_dusk', 19: 'period_dusk',
-    # Night: 8 PM to 3 AM
-    20: 'period_night', 21: 'period_night', 22: 'period_night', 23: 'period_night',
-    0: 'period_night', 1: 'period_night', 2: 'period_night', 3: 'period_night'
-}
+    'period_dusk', 'period_dusk',
+    # Night: 8 PM to 11 PM
+    'period_night', 'period_night', 'period_night', 'period_night',
+)
+
+# Minute (0-59) rounded to the nearest quarter hour, and whether that
+# rounding rolls over into the next hour
+MINUTE_ROUNDED = (0,) * 8 + (15,) * 15 + (30,) * 15 + (45,) * 15 + (0,) * 7
+MINUTE_ROLLOVER = (False,) * 53 + (True,) * 7
+
+# Audio key for each rounded minute (nothing is said on the hour)
+MINUTE_KEYS = {15: 'minute_15', 30: 'minute_30', 45: 'minute_45'}
 
 # Global variables
 running = True
+validated_keys = set()
+last_validated = None
+sound_cache = {}
+frame_cache = {}
+sequence_cache = {}
+pcm_cache = {}
+
+# Announcements waiting for the playback thread; holds at most one so a
+# slow playback never builds up a backlog
+announcement_queue = queue.Queue(maxsize=1)
+
+def get_audio_path(key):
+    """Return the full path of an audio file, resolving it on first use"""
+    file_path = AUDIO_PATHS.get(key)
+    if file_path is None:
+        file_path = AUDIO_PATHS[key] = os.path.join(AUDIO_DIR, AUDIO_FILES[key])
+    return file_path
 
 def get_audio_files_for_time():
-    """Get the list of audio files needed to announce the current time"""
+    """Get the list of audio keys needed to announce the current time"""
     now = datetime.datetime.now()
     hour_24 = now.hour
     hour_12 = now.hour % 12
@@ -81,16 +118,8 @@ def get_audio_files_for_time():
     minute = now.minute
     
     # Round to the nearest interval
-    if minute < 8:
-        minute_rounded = 0
-    elif minute < 23:
-        minute_rounded = 15
-    elif minute < 38:
-        minute_rounded = 30
-    elif minute < 53:
-        minute_rounded = 45
-    else:
-        minute_rounded = 0
+    minute_rounded = MINUTE_ROUNDED[minute]
+    if MINUTE_ROLLOVER[minute]:
         hour_12 = (hour_12 % 12) + 1
         hour_24 = (hour_24 + 1) % 24
     
@@ -99,67 +128,236 @@ def get_audio_files_for_time():
     
     # Sequence: "এখন সময়, [time period], [hour]টা, [minutes]"
     # Add intro - "এখন সময়"
-    files.append(AUDIO_FILES['intro'])
+    files.append('intro')
     
     # Add time period (e.g., সকাল, দুপুর, etc.)
-    files.append(AUDIO_FILES[TIME_PERIODS[hour_24]])
+    files.append(TIME_PERIODS[hour_24])
     
     # Add hour (with টা already included)
-    files.append(AUDIO_FILES[f'hour_{hour_12}'])
+    files.append(f'hour_{hour_12}')
     
     # Add minutes part if not on the hour
-    if minute_rounded == 15:
-        files.append(AUDIO_FILES['minute_15'])
-    elif minute_rounded == 30:
-        files.append(AUDIO_FILES['minute_30'])
-    elif minute_rounded == 45:
-        files.append(AUDIO_FILES['minute_45'])
+    minute_key = MINUTE_KEYS.get(minute_rounded)
+    if minute_key:
+        files.append(minute_key)
     
     return files
 
-def play_audio_sequence_pygame(audio_files):
-    """Play a sequence of audio files using pygame"""
-    pygame.mixer.init()
+def load_pcm():
+    """Decode all validated audio files into PCM arrays for sounddevice"""
+    import soundfile
     
-    for audio_file in audio_files:
-        full_path = os.path.join(AUDIO_DIR, audio_file)
-        if not os.path.exists(full_path):
-            print(f"Warning: Audio file not found: {full_path}")
-            continue
-            
+    for key in validated_keys - pcm_cache.keys():
         try:
-            sound = pygame.mixer.Sound(full_path)
-            sound.play()
-            # Wait for the audio to finish
-            while pygame.mixer.get_busy():
-                pygame.time.delay(100)
+            pcm_cache[key] = soundfile.read(get_audio_path(key), dtype='int16')
         except Exception as e:
-            print(f"Error playing audio file {audio_file}: {e}")
+            print(f"Error loading audio file {AUDIO_FILES[key]}: {e}")
+            # Remember the failure so the file is not decoded again on every announcement
+            pcm_cache[key] = None
 
-def play_audio_sequence_aplay(audio_files):
-    """Play a sequence of audio files using aplay"""
-    for audio_file in audio_files:
-        full_path = os.path.join(AUDIO_DIR, audio_file)
-        if not os.path.exists(full_path):
-            print(f"Warning: Audio file not found: {full_path}")
-            continue
-            
+def play_audio_sequence_sounddevice(audio_keys):
+    """Play a sequence of audio files using sounddevice"""
+    import numpy
+    import sounddevice
+    
+    load_pcm()
+    
+    clips = [pcm_cache[key] for key in audio_keys if pcm_cache.get(key) is not None]
+    if not clips:
+        return
+    
+    try:
+        # Clips in the same format are joined and written as one stream
+        rate = clips[0][1]
+        if all(clip_rate == rate and data.shape[1:] == clips[0][0].shape[1:] for data, clip_rate in clips):
+            sounddevice.play(numpy.concatenate([data for data, _ in clips]), rate)
+            sounddevice.wait()
+        else:
+            for data, clip_rate in clips:
+                sounddevice.play(data, clip_rate)
+                sounddevice.wait()
+    except Exception as e:
+        print(f"Error playing audio files: {e}")
+
+def load_sounds():
+    """Decode all validated audio files into pygame Sound objects"""
+    import pygame
+    
+    for key in validated_keys - sound_cache.keys():
         try:
-            subprocess.run(["aplay", full_path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            sound_cache[key] = pygame.mixer.Sound(get_audio_path(key))
         except Exception as e:
-            print(f"Error playing audio file {audio_file}: {e}")
+            print(f"Error loading audio file {AUDIO_FILES[key]}: {e}")
+            sound_cache[key] = None
+
+def load_frames():
+    """Read the raw PCM frames of all validated audio files into memory"""
+    for key in validated_keys - frame_cache.keys():
+        try:
+            with wave.open(get_audio_path(key), 'rb') as clip:
+                params = (clip.getnchannels(), clip.getsampwidth(), clip.getframerate())
+                frame_cache[key] = (params, clip.readframes(clip.getnframes()))
+        except Exception as e:
+            print(f"Error loading audio file {AUDIO_FILES[key]}: {e}")
+            frame_cache[key] = None
+
+def load_sequence_sound(audio_keys):
+    """Join the clips for a sequence into one pygame Sound, or None if their formats differ"""
+    import pygame
+    
+    clips = [frame_cache[key] for key in audio_keys if frame_cache.get(key) is not None]
+    if not clips:
+        return None
+    params = clips[0][0]
+    if any(clip_params != params for clip_params, _ in clips):
+        return None
+    frames = [clip_frames for _, clip_frames in clips]
+    
+    # Wrap the joined frames in an in-memory WAV so pygame converts them to the mixer format
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as joined:
+        joined.setnchannels(params[0])
+        joined.setsampwidth(params[1])
+        joined.setframerate(params[2])
+        joined.writeframes(b''.join(frames))
+    buffer.seek(0)
+    return pygame.mixer.Sound(file=buffer)
+
+def play_audio_sequence_pygame(audio_keys):
+    """Play a sequence of audio files using pygame"""
+    import pygame
+    
+    if not audio_keys:
+        return
+    
+    # Each distinct announcement is joined from the clips held in memory the
+    # first time it is needed; there are at most 96 (24 hours x 4 quarters)
+    sequence = tuple(audio_keys)
+    sound = sequence_cache.get(sequence)
+    if sequence not in sequence_cache:
+        load_frames()
+        try:
+            sound = load_sequence_sound(sequence)
+        except Exception as e:
+            print(f"Error loading audio files: {e}")
+            sound = None
+        # Only remember the result once every clip could be read
+        if all(frame_cache.get(key) is not None for key in sequence):
+            sequence_cache[sequence] = sound
+    
+    if sound is None:
+        play_sounds_queued(audio_keys)
+        return
+    
+    try:
+        channel = sound.play()
+        pygame.time.wait(int(sound.get_length() * 1000))
+        while channel is not None and channel.get_busy():
+            pygame.time.wait(10)
+    except Exception as e:
+        print(f"Error playing audio files: {e}")
+
+def play_sounds_queued(audio_keys):
+    """Play a sequence of audio files clip by clip on one pygame channel"""
+    import pygame
+    
+    load_sounds()
+    
+    sounds = [sound_cache[key] for key in audio_keys if sound_cache.get(key) is not None]
+    if not sounds:
+        return
+    
+    try:
+        # Chain the clips on one channel; pygame holds one queued sound,
+        # so feed the next clip each time the current one is expected to end
+        channel = pygame.mixer.Channel(0)
+        channel.play(sounds[0])
+        for current, following in zip(sounds, sounds[1:]):
+            channel.queue(following)
+            pygame.time.wait(int(current.get_length() * 1000))
+            while channel.get_queue() is not None:
+                pygame.time.wait(10)
+        
+        # Wait for the last clip to finish
+        pygame.time.wait(int(sounds[-1].get_length() * 1000))
+        while channel.get_busy():
+            pygame.time.wait(10)
+    except Exception as e:
+        print(f"Error playing audio files: {e}")
+
+def play_audio_sequence_aplay(audio_keys):
+    """Play a sequence of audio files using aplay"""
+    if not audio_keys:
+        return
+    
+    # aplay plays multiple files back to back, so one process covers the whole sequence
+    try:
+        subprocess.run(["aplay", "-q", "--", *[get_audio_path(key) for key in audio_keys]],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except Exception as e:
+        print(f"Error playing audio files: {e}")
+
+def play_audio_sequence(audio_keys):
+    """Play a sequence of audio keys with the available backend"""
+    # Validates the files on the first call, and again once the last check is stale
+    revalidate_audio_files()
+    
+    audio_keys = [key for key in audio_keys if key in validated_keys]
+    
+    if SOUNDDEVICE_AVAILABLE:
+        play_audio_sequence_sounddevice(audio_keys)
+    elif PYGAME_AVAILABLE:
+        play_audio_sequence_pygame(audio_keys)
+    else:
+        play_audio_sequence_aplay(audio_keys)
 
 def announce_time():
     """Announce the current time using audio files"""
     now = datetime.datetime.now()
     print(f"[{now:%Y-%m-%d %H:%M:%S}] Announcing time...")
     
-    audio_files = get_audio_files_for_time()
+    play_audio_sequence(get_audio_files_for_time())
+
+def queue_announcement():
+    """Hand the current time to the playback thread, skipping it if one is still pending"""
+    now = datetime.datetime.now()
+    print(f"[{now:%Y-%m-%d %H:%M:%S}] Announcing time...")
     
-    if PYGAME_AVAILABLE:
-        play_audio_sequence_pygame(audio_files)
-    else:
-        play_audio_sequence_aplay(audio_files)
+    try:
+        announcement_queue.put_nowait(get_audio_files_for_time())
+    except queue.Full:
+        print("Warning: Previous announcement is still pending, skipping this one.")
+
+def playback_worker():
+    """Play queued announcements so the scheduler never waits on audio"""
+    while True:
+        audio_keys = announcement_queue.get()
+        if audio_keys is None:
+            break
+        
+        # Keep the thread alive whatever goes wrong with one announcement
+        try:
+            play_audio_sequence(audio_keys)
+            # Refresh the file check after playing, on this thread, so it
+            # neither delays an announcement nor races with the caches
+            revalidate_audio_files()
+        except Exception as e:
+            print(f"Error playing announcement: {e}")
+
+def stop_playback_worker(worker):
+    """Drop any pending announcement and wait for the playback thread to finish"""
+    try:
+        announcement_queue.get_nowait()
+    except queue.Empty:
+        pass
+    announcement_queue.put(None)
+    worker.join()
+
+def revalidate_audio_files():
+    """Re-check the files on disk once the last check has gone stale"""
+    if last_validated is None or time.monotonic() - last_validated > AUDIO_VALIDATION_TTL:
+        for file_name in check_audio_files():
+            print(f"Warning: Audio file not found: {os.path.join(AUDIO_DIR, file_name)}")
 
 def signal_handler(sig, frame):
     """Handle Ctrl+C signal"""
@@ -169,30 +367,83 @@ def signal_handler(sig, frame):
 
 def check_audio_files():
     """Check if required audio files exist, return list of missing files"""
+    global last_validated
     missing_files = []
+    found_keys = set()
+    last_validated = time.monotonic()
     
-    if not os.path.exists(AUDIO_DIR):
+    # List the directory once instead of checking each file separately
+    try:
+        with os.scandir(AUDIO_DIR) as entries:
+            present_files = {entry.name for entry in entries}
+    except FileNotFoundError:
+        present_files = set()
         try:
             os.makedirs(AUDIO_DIR)
             print(f"Created audio directory: {AUDIO_DIR}")
         except Exception as e:
             print(f"Error creating audio directory: {e}")
-            return list(AUDIO_FILES.values())
+    except OSError as e:
+        print(f"Error reading audio directory: {e}")
+        present_files = set()
     
-    for file_name in AUDIO_FILES.values():
-        file_path = os.path.join(AUDIO_DIR, file_name)
-        if not os.path.exists(file_path):
+    # Resolve the paths and check them in the same pass
+    for key, file_name in AUDIO_FILES.items():
+        get_audio_path(key)
+        if file_name in present_files:
+            found_keys.add(key)
+        else:
             missing_files.append(file_name)
+    
+    # Keep the decoded audio of files that are still there; only drop what disappeared
+    removed_keys = validated_keys - found_keys
+    for key in removed_keys:
+        sound_cache.pop(key, None)
+        pcm_cache.pop(key, None)
+        frame_cache.pop(key, None)
+    for sequence in [sequence for sequence in sequence_cache if not found_keys.issuperset(sequence)]:
+        del sequence_cache[sequence]
+    validated_keys.difference_update(removed_keys)
+    validated_keys.update(found_keys)
             
     return missing_files
 
 def run_announcer(interval=30, test_only=False):
     """Main function to run the time announcer"""
-    global running
+    global running, SOUNDDEVICE_AVAILABLE, PYGAME_AVAILABLE
+    
+    # sounddevice and soundfile also need the PortAudio and libsndfile
+    # libraries, which are only found on import
+    if SOUNDDEVICE_AVAILABLE:
+        try:
+            import numpy
+            import sounddevice
+            import soundfile
+        except (ImportError, OSError) as e:
+            print(f"Warning: sounddevice could not be loaded ({e}), falling back to pygame or aplay.")
+            SOUNDDEVICE_AVAILABLE = False
+    
+    # pygame can be installed but still fail to import, e.g. without libSDL2
+    if PYGAME_AVAILABLE and not SOUNDDEVICE_AVAILABLE:
+        try:
+            import pygame
+        except ImportError:
+            PYGAME_AVAILABLE = False
+    
+    # Open the audio device once and keep it for the lifetime of the process
+    if PYGAME_AVAILABLE and not SOUNDDEVICE_AVAILABLE:
+        try:
+            pygame.mixer.pre_init(frequency=22050, size=-16, channels=1, buffer=512)
+            pygame.mixer.init()
+        except pygame.error as e:
+            print(f"Warning: pygame mixer could not be initialized ({e})")
+            PYGAME_AVAILABLE = False
+        else:
+            atexit.register(pygame.mixer.quit)
     
     # Check if pygame is available, otherwise try to use aplay
-    if not PYGAME_AVAILABLE:
-        print("Warning: pygame not found, trying to use aplay instead.")
+    if not SOUNDDEVICE_AVAILABLE and not PYGAME_AVAILABLE:
+        print("Warning: pygame not available, trying to use aplay instead.")
         try:
             subprocess.run(["aplay", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
         except:
@@ -223,49 +474,68 @@ def run_announcer(interval=30, test_only=False):
     print(f"Audio files directory: {AUDIO_DIR}")
     print("Press Ctrl+C to stop")
     
-    # Announce once at startup
-    announce_time()
+    worker = threading.Thread(target=playback_worker, daemon=True)
+    worker.start()
     
-    # Main loop
-    while running:
-        now = datetime.datetime.now()
-        
-        # Calculate time until next announcement
-        if interval == 15:
-            # Every 15 minutes (XX:00, XX:15, XX:30, XX:45)
-            next_minute = ((now.minute // 15) + 1) * 15
-            if next_minute == 60:
-                next_time = now.replace(minute=0, second=0, microsecond=0) + datetime.timedelta(hours=1)
-            else:
-                next_time = now.replace(minute=next_minute, second=0, microsecond=0)
-        elif interval == 30:
-            # Every 30 minutes (XX:00, XX:30)
-            if now.minute < 30:
-                next_time = now.replace(minute=30, second=0, microsecond=0)
-            else:
-                next_time = now.replace(minute=0, second=0, microsecond=0) + datetime.timedelta(hours=1)
-        else:  # interval == 60
-            # Every hour (XX:00)
-            next_time = now.replace(minute=0, second=0, microsecond=0) + datetime.timedelta(hours=1)
-        
-        # Wait until next announcement time
-        wait_seconds = (next_time - now).total_seconds()
-        
-        while wait_seconds > 0 and running:
-            # Sleep in smaller chunks to be responsive to Ctrl+C
-            sleep_time = min(wait_seconds, 10)
-            time.sleep(sleep_time)
-            wait_seconds -= sleep_time
-            if not running:
-                break
+    # Signals write to this pipe, so waiting on it wakes up as soon as Ctrl+C is pressed
+    wakeup_read, wakeup_write = os.pipe()
+    os.set_blocking(wakeup_read, False)
+    os.set_blocking(wakeup_write, False)
+    previous_wakeup_fd = signal.set_wakeup_fd(wakeup_write)
+    
+    try:
+        # Announce once at startup
+        queue_announcement()
         
-        # If we're still running, announce the time
-        if running:
-            announce_time()
+        # Main loop
+        while running:
+            now = datetime.datetime.now()
+            
+            # Next multiple of the interval, counted in minutes since midnight
+            next_total = ((now.hour * 60 + now.minute) // interval + 1) * interval
+            midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            next_time = midnight + datetime.timedelta(minutes=next_total)
+            
+            # Wait until next announcement time, timed on the monotonic clock
+            # so a wall clock step during the wait does not stretch it
+            deadline = time.monotonic() + max(next_time.timestamp() - time.time(), 0)
+            
+            # Wait for either the deadline or a signal on the wakeup pipe;
+            # signal_handler clears running for Ctrl+C, other signals just wake us
+            remaining = deadline - time.monotonic()
+            while remaining > 0 and running:
+                ready, _, _ = select.select([wakeup_read], [], [], remaining)
+                if ready:
+                    os.read(wakeup_read, 512)
+                remaining = deadline - time.monotonic()
+            
+            # If we're still running, announce the time
+            if running:
+                queue_announcement()
+    finally:
+        signal.set_wakeup_fd(previous_wakeup_fd)
+        os.close(wakeup_read)
+        os.close(wakeup_write)
+        # Stop playback before atexit shuts down the pygame mixer
+        stop_playback_worker(worker)
 
 if __name__ == "__main__":
+    # Only needed when run as a script
+    import argparse
+    
+    def interval_minutes(value):
+        """Parse and validate the --interval argument"""
+        # Same messages as type=int with choices=[15, 30, 60]
+        try:
+            minutes = int(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid int value: {value!r}")
+        if minutes not in (15, 30, 60):
+            raise argparse.ArgumentTypeError(f"invalid choice: {minutes} (choose from 15, 30, 60)")
+        return minutes
+    
     parser = argparse.ArgumentParser(description="Bangla Time Announcer")
-    parser.add_argument("--interval", type=int, choices=[15, 30, 60], default=30,
+    parser.add_argument("--interval", type=interval_minutes, default=30, metavar="{15,30,60}",
                         help="Announcement interval in minutes (15, 30, or 60)")
     parser.add_argument("--test", action="store_true", 
                         help="Test announcement once and exit")